@@ -1,11 +1,15 @@
 # -*- coding: utf-8 -*-
 """Abstract class to represent Brazilian election."""
+import json
 import logging
 from dataclasses import dataclass
-from os import mkdir, listdir, remove, rename
+from os import mkdir, listdir, remove, rename, stat
 from os.path import join, isfile
 from abc import ABC, abstractmethod
-from typing import List
+from sys import getsizeof
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
 
 
 @dataclass
@@ -30,6 +34,8 @@ class Election(ABC):
             Currenti working directory
         logger_name: str
             Name of the logger
+        shared_assets: Optional[Dict]
+            Loaded assets shared between the pipelines of a batch run
 
     """
 
@@ -42,6 +48,7 @@ class Election(ABC):
     cur_dir: str = None
     logger_name: str = None
     state: str = None
+    shared_assets: Optional[Dict] = None
 
     def logger_info(self, message: str):
         """Print longger info message"""
@@ -58,6 +65,75 @@ class Election(ABC):
         logger = logging.getLogger(self.logger_name)
         logger.error(message)
 
+    def logger_memory_usage(self, message: str, before: float, after: float):
+        """Print longger info message with the memory usage before and after a stage"""
+        self.logger_info(f"{message} memory usage: {before:.2f} MB -> {after:.2f} MB.")
+
+    @staticmethod
+    def _get_memory_usage(data) -> float:
+        """Returns the memory usage of a dataframe in megabytes"""
+        return data.memory_usage(deep=True).sum() / 1024**2
+
+    @staticmethod
+    def _get_uncompacted_memory_usage(data) -> float:
+        """Returns the memory usage of a dataframe without the compact dtype schema.
+
+        Text categoricals are counted as object strings and the other numbers and
+        categoricals as 64 bits numbers, in megabytes.
+        """
+        usage = data.index.memory_usage(deep=True)
+        for col in data:
+            column = data[col]
+            if isinstance(column.dtype, pd.CategoricalDtype):
+                categories = column.cat.categories
+                if categories.dtype != object:
+                    usage += 8 * len(column)
+                    continue
+                sizes = np.append(
+                    categories.map(getsizeof).to_numpy(), getsizeof(np.nan)
+                )
+                usage += 8 * len(column) + sizes[column.cat.codes.to_numpy()].sum()
+            elif column.dtype.kind in "iuf":
+                usage += 8 * len(column)
+            else:
+                usage += column.memory_usage(index=False, deep=True)
+        return usage / 1024**2
+
+    @staticmethod
+    def _get_file_signature(filepath: str, **params) -> bytes:
+        """Returns a signature of the file that changes when it is modified"""
+        file_stat = stat(filepath)
+        return json.dumps(
+            {"mtime": file_stat.st_mtime_ns, "size": file_stat.st_size, **params}
+        ).encode()
+
+    def __getstate__(self):
+        """Leaves the shared assets behind when pickling the process to a worker"""
+        state = self.__dict__.copy()
+        state["shared_assets"] = None
+        return state
+
+    def _get_year_asset_key(self, *key) -> Tuple:
+        """Returns the key of an asset shared only by the elections of the year"""
+        return ("year", self.year, *key)
+
+    def _get_election_asset_key(self, *key) -> Tuple:
+        """Returns the key of an asset shared only by the pipelines of the election"""
+        return ("election", self.year, self.round, *key)
+
+    def _load_shared_asset(self, key, loader: Callable):
+        """Returns an asset shared between pipelines, loading it only once"""
+        if self.shared_assets is None:
+            return loader()
+        if key not in self.shared_assets:
+            self.shared_assets[key] = loader()
+        return self.shared_assets[key]
+
+    def _set_shared_asset(self, key, asset) -> None:
+        """Shares an asset with the next pipelines"""
+        if self.shared_assets is not None:
+            self.shared_assets[key] = asset
+
     def _mkdir(self, folder_name: str) -> None:
         """Creates a folder at current path"""
         # logger = logging.getLogger(self.logger_name)
@@ -0,0 +1,132 @@
+"""Persistent cache of geocoding results."""
+import json
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+RESULT_COLS = [
+    "[GEO]_LATITUDE",
+    "[GEO]_LONGITUDE",
+    "[GEO]_PRECISION",
+    "[GEO]_FETCHED_ADDRESS",
+]
+
+
+@dataclass
+class GeocodingCache:
+    """Represents an on-disk cache of geocoding results.
+
+    Results are keyed by backend, normalized query address and components, so
+    they are reused across years, rounds and aggregation levels.
+
+    Attributes
+    ----------
+        filepath: str
+            Path of the sqlite database file
+        ttl: Optional[float]
+            Number of days a cached result remains valid
+        max_size: Optional[int]
+            Maximum number of cached results kept after eviction
+        hits: int
+            Number of queries answered by the cache
+        misses: int
+            Number of queries not found in the cache
+    """
+
+    filepath: str = None
+    ttl: Optional[float] = None
+    max_size: Optional[int] = None
+    hits: int = 0
+    misses: int = 0
+    __connection: sqlite3.Connection = None
+
+    def __post_init__(self):
+        self.__connection = sqlite3.connect(self.filepath)
+        self.__connection.execute(
+            "CREATE TABLE IF NOT EXISTS geocoding ("
+            "backend TEXT, address TEXT, components TEXT, "
+            "latitude REAL, longitude REAL, precision TEXT, fetched_address TEXT, "
+            "created_at REAL, PRIMARY KEY (backend, address, components))"
+        )
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        """Normalize a query text"""
+        return " ".join(str(text).upper().split())
+
+    def _normalize_components(self, components: Optional[Dict[str, str]]) -> str:
+        """Normalize the query components as a json string"""
+        return json.dumps(
+            {key: self._normalize(value) for key, value in (components or {}).items()},
+            sort_keys=True,
+        )
+
+    def _get_expiration_time(self) -> float:
+        """Returns the creation time before which results are expired"""
+        return time.time() - self.ttl * 86400 if self.ttl else 0
+
+    def get(
+        self, backend: str, address: str, components: Optional[Dict] = None
+    ) -> Optional[Dict]:
+        """Returns the cached result of a query, or None when it is not cached"""
+        row = self.__connection.execute(
+            "SELECT latitude, longitude, precision, fetched_address FROM geocoding "
+            "WHERE backend = ? AND address = ? AND components = ? AND created_at >= ?",
+            (
+                backend,
+                self._normalize(address),
+                self._normalize_components(components),
+                self._get_expiration_time(),
+            ),
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if row[0] is None:
+            return {}
+        return dict(zip(RESULT_COLS, row))
+
+    def set(
+        self,
+        backend: str,
+        address: str,
+        components: Optional[Dict],
+        result: Dict,
+    ) -> None:
+        """Cache the result of a query, an empty result means nothing was found"""
+        self.__connection.execute(
+            "INSERT OR REPLACE INTO geocoding VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                backend,
+                self._normalize(address),
+                self._normalize_components(components),
+                *[result.get(col) for col in RESULT_COLS],
+                time.time(),
+            ),
+        )
+
+    def evict(self) -> None:
+        """Remove expired results and the oldest ones above the maximum size"""
+        if self.ttl:
+            self.__connection.execute(
+                "DELETE FROM geocoding WHERE created_at < ?",
+                (self._get_expiration_time(),),
+            )
+        if self.max_size:
+            self.__connection.execute(
+                "DELETE FROM geocoding WHERE rowid IN (SELECT rowid FROM geocoding "
+                "ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_size,),
+            )
+
+    def commit(self) -> None:
+        """Write the pending results to disk"""
+        self.__connection.commit()
+
+    def close(self) -> None:
+        """Evict, commit and close the cache"""
+        self.evict()
+        self.commit()
+        self.__connection.close()
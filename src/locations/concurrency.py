@@ -0,0 +1,92 @@
+"""Concurrent geocoding engine with token-bucket rate limiting."""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional
+
+
+@dataclass
+class TokenBucket:
+    """Represents a token-bucket rate limiter.
+
+    Attributes
+    ----------
+        rate: float
+            Number of tokens added to the bucket per second
+        capacity: float
+            Maximum number of tokens in the bucket (the allowed burst)
+    """
+
+    rate: float = 1.0
+    capacity: float = 1.0
+    __tokens: float = None
+    __updated_at: float = None
+    __lock: asyncio.Lock = None
+
+    def __post_init__(self):
+        self.__tokens = self.capacity
+        self.__updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        """Add the tokens accumulated since the last update"""
+        now = time.monotonic()
+        self.__tokens = min(
+            self.capacity, self.__tokens + (now - self.__updated_at) * self.rate
+        )
+        self.__updated_at = now
+
+    async def acquire(self) -> None:
+        """Wait until a token is available and consume it"""
+        if self.__lock is None:
+            self.__lock = asyncio.Lock()
+        async with self.__lock:
+            self._refill()
+            while self.__tokens < 1:
+                await asyncio.sleep((1 - self.__tokens) / self.rate)
+                self._refill()
+            self.__tokens -= 1
+
+
+async def _geocode_all(
+    queries: List[Any],
+    geocode: Callable[[Any], Any],
+    rate: float,
+    concurrency: int,
+) -> List[Optional[Any]]:
+    """Geocode all queries keeping up to `concurrency` requests in flight"""
+    bucket = TokenBucket(rate=rate)
+    semaphore = asyncio.Semaphore(concurrency)
+    loop = asyncio.get_running_loop()
+
+    def _geocode(query):
+        try:
+            return geocode(query)
+        except ConnectionError:
+            return None
+
+    async def _geocode_query(executor, query):
+        async with semaphore:
+            await bucket.acquire()
+            return await loop.run_in_executor(executor, _geocode, query)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = await asyncio.gather(
+            *(_geocode_query(executor, query) for query in queries)
+        )
+    return results
+
+
+def geocode_concurrently(
+    queries: List[Any],
+    geocode: Callable[[Any], Any],
+    rate: float,
+    concurrency: int,
+) -> List[Optional[Any]]:
+    """Returns the geocoding results of the queries, in the same order.
+
+    The blocking `geocode` function runs in a thread pool while an asyncio event
+    loop keeps up to `concurrency` queries in flight, started at most `rate`
+    times per second. Queries failing with a connection error return None.
+    """
+    return asyncio.run(_geocode_all(queries, geocode, rate, concurrency))
@@ -0,0 +1,180 @@
+"""Offline geocoding of addresses based on an address gazetteer."""
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+import Levenshtein
+
+GAZETTEER_COLS = {
+    "STREET": "str",
+    "NUMBER": "str",
+    "CEP": "str",
+    "NEIGHBORHOOD": "str",
+    "CITY": "str",
+    "UF": "str",
+    "LATITUDE": "float",
+    "LONGITUDE": "float",
+}
+
+STREET_TYPES = {
+    "R": "RUA",
+    "AV": "AVENIDA",
+    "TV": "TRAVESSA",
+    "TRAV": "TRAVESSA",
+    "AL": "ALAMEDA",
+    "PC": "PRACA",
+    "PCA": "PRACA",
+    "ROD": "RODOVIA",
+    "EST": "ESTRADA",
+    "ESTR": "ESTRADA",
+}
+
+STOPWORDS = {"DA", "DE", "DO", "DAS", "DOS", "E", *STREET_TYPES.values()}
+
+
+def normalize_address(text: str) -> str:
+    """Returns the text in upper case without accents, punctuation and abbreviations"""
+    if not isinstance(text, str):
+        return ""
+    text = unicodedata.normalize("NFKD", text.upper()).encode("ascii", "ignore")
+    tokens = re.sub(r"[^A-Z0-9]+", " ", text.decode()).split()
+    return " ".join(STREET_TYPES.get(token, token) for token in tokens)
+
+
+def remove_street_type(street: str) -> str:
+    """Returns the normalized street name without its leading street type"""
+    street_type, _, name = street.partition(" ")
+    return name if name and street_type in STREET_TYPES.values() else street
+
+
+def split_street_number(address: str) -> Tuple[str, Optional[int]]:
+    """Returns the normalized street of an address and its house number"""
+    if not isinstance(address, str):
+        return "", None
+    street, _, complement = address.partition(",")
+    street = normalize_address(street)
+    number = re.search(r"\d+", complement)
+    if number is not None:
+        return street, int(number.group())
+    number = re.fullmatch(r"(.+) (?:N|NO|NUMERO) (\d+)", street)
+    if number is not None:
+        return number.group(1), int(number.group(2))
+    return street, None
+
+
+@dataclass
+class Gazetteer:
+    """Represents an in-memory index of a street addresses gazetteer.
+
+    Streets are blocked by city and street token, so each query is only
+    compared with the streets of its city sharing at least one token with it.
+
+    Attributes
+    ----------
+        filepath: str
+            Path of the gazetteer csv file with the GAZETTEER_COLS columns
+        min_similarity: float
+            Minimum levenshtein similarity between street names to match them
+    """
+
+    filepath: str = None
+    min_similarity: float = 0.8
+    __streets: pd.DataFrame = None
+    __blocks: Dict[Tuple[str, str, str], List[int]] = field(default_factory=dict)
+    __street_ids: np.ndarray = None
+    __numbers: np.ndarray = None
+    __coordinates: np.ndarray = None
+
+    def __post_init__(self):
+        data = pd.read_csv(
+            self.filepath, usecols=list(GAZETTEER_COLS), dtype=GAZETTEER_COLS
+        )
+        data = data.dropna(subset=["STREET", "CITY", "UF", "LATITUDE", "LONGITUDE"])
+        data["UF"] = data["UF"].str.strip().str.upper()
+        data["CITY"] = self._normalize_column(data["CITY"])
+        data["STREET"] = self._normalize_column(data["STREET"])
+        data["NUMBER"] = pd.to_numeric(data["NUMBER"], errors="coerce")
+        data["STREET_ID"] = data.groupby(["UF", "CITY", "STREET"], sort=False).ngroup()
+        self._index_streets(data)
+        self._index_numbers(data)
+
+    @staticmethod
+    def _normalize_column(column: pd.Series) -> pd.Series:
+        """Normalize each unique value of the column only once"""
+        values = column.unique()
+        return column.map(dict(zip(values, map(normalize_address, values))))
+
+    def _index_streets(self, data: pd.DataFrame) -> None:
+        """Create the streets table and block the streets by city and token"""
+        self.__streets = data.groupby("STREET_ID").agg(
+            UF=("UF", "first"),
+            CITY=("CITY", "first"),
+            STREET=("STREET", "first"),
+            LATITUDE=("LATITUDE", "mean"),
+            LONGITUDE=("LONGITUDE", "mean"),
+        )
+        self.__streets["NAME"] = self.__streets["STREET"].map(remove_street_type)
+        for street_id, uf, city, street in zip(
+            self.__streets.index,
+            self.__streets["UF"],
+            self.__streets["CITY"],
+            self.__streets["STREET"],
+        ):
+            for token in set(street.split()) - STOPWORDS:
+                self.__blocks.setdefault((uf, city, token), []).append(street_id)
+
+    def _index_numbers(self, data: pd.DataFrame) -> None:
+        """Sort the numbered addresses by street and house number"""
+        numbered = data.dropna(subset=["NUMBER"]).sort_values(["STREET_ID", "NUMBER"])
+        self.__street_ids = numbered["STREET_ID"].to_numpy()
+        self.__numbers = numbered["NUMBER"].to_numpy()
+        self.__coordinates = numbered[["LATITUDE", "LONGITUDE"]].to_numpy()
+
+    def _match_street(self, street: str, city: str, uf: str) -> Optional[int]:
+        """Returns the id of the most similar street name of the city, if similar enough"""
+        candidates = {
+            street_id
+            for token in set(street.split()) - STOPWORDS
+            for street_id in self.__blocks.get((uf, city, token), [])
+        }
+        if not candidates:
+            return None
+        name = remove_street_type(street)
+        names = self.__streets["NAME"].to_numpy()
+        similarity, street_id = max(
+            (Levenshtein.ratio(name, names[street_id]), street_id)
+            for street_id in candidates
+        )
+        return street_id if similarity >= self.min_similarity else None
+
+    def _locate_number(
+        self, street_id: int, number: Optional[int]
+    ) -> Tuple[float, float]:
+        """Returns the coordinates of the nearest house number of the street"""
+        start, end = np.searchsorted(self.__street_ids, [street_id, street_id + 1])
+        if number is None or start == end:
+            street = self.__streets.loc[street_id]
+            return street["LATITUDE"], street["LONGITUDE"]
+        numbers = self.__numbers[start:end]
+        nearest = np.abs(numbers - number).argmin()
+        return tuple(self.__coordinates[start + nearest])
+
+    def geocode(self, address: str, city: str, uf: str) -> Dict:
+        """Returns the columns values of the address geocoding, empty if not found"""
+        street, number = split_street_number(address)
+        city, uf = normalize_address(city), str(uf).strip().upper()
+        street_id = self._match_street(street, city, uf)
+        if street_id is None:
+            return {}
+        latitude, longitude = self._locate_number(street_id, number)
+        name = self.__streets.at[street_id, "STREET"]
+        if number is not None:
+            name = f"{name}, {number}"
+        return {
+            "[GEO]_LATITUDE": latitude,
+            "[GEO]_LONGITUDE": longitude,
+            "[GEO]_PRECISION": "LOCAL",
+            "[GEO]_FETCHED_ADDRESS": f"{name}, {city} - {uf}",
+        }
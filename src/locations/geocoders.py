@@ -0,0 +1,214 @@
+"""Geocoding backends selected by the geocoding api name."""
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Callable, ClassVar, Dict, List, Optional, Type
+import pandas as pd
+import googlemaps
+from geopy.geocoders import Nominatim
+from src.locations.concurrency import geocode_concurrently
+from src.locations.gazetteer import Gazetteer
+
+GEOCODERS: Dict[str, Type["Geocoder"]] = {}
+
+
+def register_geocoder(name: str) -> Callable:
+    """Register a geocoder class under the geocoding api name"""
+
+    def register(geocoder: Type["Geocoder"]) -> Type["Geocoder"]:
+        geocoder.name = name
+        GEOCODERS[name] = geocoder
+        return geocoder
+
+    return register
+
+
+@dataclass
+class Geocoder(ABC):
+    """Represents a geocoding backend.
+
+    A geocoder receives a batch of unique queries, with its `query_cols`
+    columns, and returns one result per query: the values of the result
+    columns, an empty dictionary when nothing was found or None when the
+    query failed and should be retried later.
+
+    Its dataclass fields are filled with the locations Interim attributes of
+    the same name.
+    """
+
+    name: ClassVar[str] = None
+    query_cols: ClassVar[List[str]] = ["address"]
+    clean_address: ClassVar[bool] = False
+    pending_only: ClassVar[bool] = True
+    remote: ClassVar[bool] = False
+
+    def get_components(self, query: Dict) -> Optional[Dict]:
+        """Returns the components restricting the search of the query"""
+        return None
+
+    @abstractmethod
+    def geocode_many(self, queries: pd.DataFrame) -> List[Optional[Dict]]:
+        """Returns the results of the queries, in the same order"""
+
+
+@dataclass
+class RemoteGeocoder(Geocoder):
+    """Represents a geocoding api queried concurrently under a rate limit.
+
+    Attributes
+    ----------
+        concurrency: int
+            Number of geocoding requests kept in flight
+        geocoding_rate: Optional[float]
+            Maximum number of geocoding requests per second
+    """
+
+    default_rate: ClassVar[float] = 1
+    remote: ClassVar[bool] = True
+    concurrency: int = 1
+    geocoding_rate: Optional[float] = None
+
+    @abstractmethod
+    def geocode(self, query: Dict) -> Dict:
+        """Returns the result of a single query"""
+
+    def geocode_many(self, queries: pd.DataFrame) -> List[Optional[Dict]]:
+        return geocode_concurrently(
+            queries=queries.to_dict("records"),
+            geocode=self.geocode,
+            rate=self.geocoding_rate or self.default_rate,
+            concurrency=self.concurrency,
+        )
+
+
+@register_geocoder("GMAPS")
+@dataclass
+class GoogleMapsGeocoder(RemoteGeocoder):
+    """Represents the google maps geocoding api.
+
+    Attributes
+    ----------
+        api_key: str
+            The key of the google maps api
+        region: str
+            The country restricting the search
+    """
+
+    query_cols = ["address", "city"]
+    default_rate = 40
+    api_key: str = None
+    region: str = None
+    __client: googlemaps.Client = None
+
+    def __post_init__(self):
+        self.__client = googlemaps.Client(key=self.api_key, queries_per_second=40)
+
+    def get_components(self, query: Dict) -> Optional[Dict]:
+        if not isinstance(query["city"], str):
+            return None
+        return {"country": self.region, "administrative_area": query["city"]}
+
+    def geocode(self, query: Dict) -> Dict:
+        result = self.__client.geocode(
+            language="pt-BR",
+            address=query["address"],
+            components=self.get_components(query),
+        )
+        if not result:
+            return {}
+        return {
+            "[GEO]_LATITUDE": result[0]["geometry"]["location"]["lat"],
+            "[GEO]_LONGITUDE": result[0]["geometry"]["location"]["lng"],
+            "[GEO]_PRECISION": result[0]["geometry"]["location_type"],
+            "[GEO]_FETCHED_ADDRESS": result[0]["formatted_address"],
+        }
+
+
+@register_geocoder("OSM")
+@dataclass
+class OpenStreetGeocoder(RemoteGeocoder):
+    """Represents the openstreet map geocoding api (Nominatim).
+
+    Attributes
+    ----------
+        osm_domain: Optional[str]
+            Domain of a self-hosted Nominatim server
+        osm_scheme: Optional[str]
+            Scheme used to connect to the Nominatim server [https, http]
+    """
+
+    osm_domain: Optional[str] = None
+    osm_scheme: Optional[str] = None
+    __geolocator: Nominatim = None
+
+    def __post_init__(self):
+        osm_server = {"domain": self.osm_domain, "scheme": self.osm_scheme}
+        self.__geolocator = Nominatim(
+            user_agent="brazilian_polling_places",
+            **{key: value for key, value in osm_server.items() if value},
+        )
+
+    def geocode(self, query: Dict) -> Dict:
+        result = self.__geolocator.geocode(query["address"])
+        if not result:
+            return {}
+        return {
+            "[GEO]_LATITUDE": result.latitude,
+            "[GEO]_LONGITUDE": result.longitude,
+            "[GEO]_PRECISION": self.name,
+            "[GEO]_FETCHED_ADDRESS": result.address,
+        }
+
+
+@register_geocoder("IBGE")
+@dataclass
+class IBGEGeocoder(Geocoder):
+    """Represents the geocoding of every polling place by its city centroid.
+
+    Attributes
+    ----------
+        centroids: pd.DataFrame
+            The X and Y coordinates of the cities centroids indexed by city id
+    """
+
+    query_cols = ["address", "city_id"]
+    clean_address = True
+    pending_only = False
+    centroids: pd.DataFrame = None
+
+    def geocode_many(self, queries: pd.DataFrame) -> List[Optional[Dict]]:
+        located = self.centroids.reindex(queries["city_id"].to_numpy())
+        return [
+            {
+                "[GEO]_LATITUDE": latitude,
+                "[GEO]_LONGITUDE": longitude,
+                "[GEO]_PRECISION": self.name,
+                "[GEO]_FETCHED_ADDRESS": address,
+            }
+            for address, longitude, latitude in zip(
+                queries["address"], located["X"], located["Y"]
+            )
+        ]
+
+
+@register_geocoder("LOCAL")
+@dataclass
+class LocalGeocoder(Geocoder):
+    """Represents the offline geocoding based on an addresses gazetteer.
+
+    Attributes
+    ----------
+        gazetteer: Gazetteer
+            The index of the gazetteer streets
+    """
+
+    query_cols = ["address", "city", "uf"]
+    clean_address = True
+    gazetteer: Gazetteer = None
+
+    def geocode_many(self, queries: pd.DataFrame) -> List[Optional[Dict]]:
+        return [
+            self.gazetteer.geocode(address, city, uf)
+            for address, city, uf in zip(
+                queries["address"], queries["city"], queries["uf"]
+            )
+        ]
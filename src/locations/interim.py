@@ -1,30 +1,35 @@
 """Generates interim data for locations."""
-from os.path import join
-from dataclasses import dataclass, field
-from typing import Optional
+import json
+from os.path import isfile, join
+from dataclasses import dataclass, field, fields
+from typing import Dict, List, Optional
 import pandas as pd
 import geopandas as gpd
 import numpy as np
-import googlemaps
+import pyarrow as pa
+import pyarrow.parquet as pq
 from tqdm import tqdm
-from geopy.geocoders import Nominatim
 from src.election import Election
+from src.locations.cache import RESULT_COLS, GeocodingCache
+from src.locations.gazetteer import Gazetteer
+from src.locations.geocoders import GEOCODERS, Geocoder
+from src.locations.journal import GeocodingJournal
 
 MAP_COL_DTYPES = {
-    "SGL_UF": "str",
-    "COD_LOCALIDADE_IBGE": "str",
-    "LOCALIDADE_LOCAL_VOTACAO": "str",
-    "ZONA": "str",
-    "BAIRRO_ZONA_SEDE": "str",
+    "SGL_UF": "category",
+    "COD_LOCALIDADE_IBGE": "category",
+    "LOCALIDADE_LOCAL_VOTACAO": "category",
+    "ZONA": "category",
+    "BAIRRO_ZONA_SEDE": "category",
     "LATITUDE_ZONA": "float",
     "LONGITUDE_ZONA": "float",
-    "NUM_LOCAL": "str",
+    "NUM_LOCAL": "category",
     "SITUACAO_LOCAL": "str",
     "TIPO_LOCAL": "str",
-    "LOCAL_VOTACAO": "str",
-    "ENDERECO": "str",
-    "BAIRRO_LOCAL_VOT": "str",
-    "CEP": "str",
+    "LOCAL_VOTACAO": "category",
+    "ENDERECO": "category",
+    "BAIRRO_LOCAL_VOT": "category",
+    "CEP": "category",
     "LATITUDE_LOCAL": "float",
     "LONGITUDE_LOCAL": "float",
     "NUM_SECAO": "str",
@@ -59,11 +64,32 @@ class Interim(Election):
         aggregation_level: str
             The level of aggregation [polling_places:, neighborhood, city]
         geocoding_api: str
-            The geocoding api to be used (Google Maps: GMAPS, OpenStreep Map: OSM)
+            The geocoding api to be used (Google Maps: GMAPS, OpenStreep Map: OSM,
+            IBGE cities centroids: IBGE, Offline gazetteer: LOCAL)
         api_key: Optional[str]
             The key for api that need key
         save_at: int = 1000
-            The interval of addresses to save the polling_places file
+            The interval of geocoded addresses to sync the geocoding journal
+        geocoding_cache: bool
+            Whether to reuse geocoding results stored in the on-disk cache
+        cache_ttl: Optional[float]
+            Number of days a cached geocoding result remains valid
+        cache_max_size: Optional[int]
+            Maximum number of results kept in the geocoding cache
+        concurrency: int
+            Number of geocoding requests kept in flight
+        geocoding_rate: Optional[float]
+            Maximum number of geocoding requests per second
+        osm_domain: Optional[str]
+            Domain of a self-hosted Nominatim server
+        osm_scheme: Optional[str]
+            Scheme used to connect to the Nominatim server [https, http]
+        gazetteer_filename: Optional[str]
+            The name of the addresses gazetteer file used by the LOCAL geocoding
+        gazetteer_similarity: Optional[float]
+            Minimum levenshtein similarity to match a street of the gazetteer
+        cep_filename: Optional[str]
+            The name of the CEP centroids file used before the geocoding api
     """
 
     aggregation_level: str = None
@@ -74,7 +100,19 @@ class Interim(Election):
     meshblock_col_id: Optional[str] = field(default_factory=str)
     save_at: int = 10
     data_filename: str = None
+    geocoding_cache: bool = False
+    cache_ttl: Optional[float] = None
+    cache_max_size: Optional[int] = None
+    concurrency: int = 1
+    geocoding_rate: Optional[float] = None
+    osm_domain: Optional[str] = None
+    osm_scheme: Optional[str] = None
+    gazetteer_filename: Optional[str] = None
+    gazetteer_similarity: Optional[float] = None
+    cep_filename: Optional[str] = None
     __data: pd.DataFrame = field(default_factory=pd.DataFrame)
+    __cache: Optional[GeocodingCache] = None
+    __journal: Optional[GeocodingJournal] = None
 
     # Pre-Processing functions
     def _read_csv(self):
@@ -91,8 +129,14 @@ class Interim(Election):
             sep=";",
             decimal=",",
             dtype=MAP_COL_DTYPES,
+            usecols=list(MAP_COL_RENAME),
             low_memory=False,
         ).infer_objects()
+        self.logger_memory_usage(
+            "Reading",
+            self._get_uncompacted_memory_usage(self.__data),
+            self._get_memory_usage(self.__data),
+        )
 
     def _rename_cols(self):
         """Filter and rename only relevant columns"""
@@ -108,10 +152,6 @@ class Interim(Election):
             "[GEO]_POLLING_PLACE_ADDRESS"
         ].str.replace(" - ZONA RURAL", "")
 
-    @staticmethod
-    def _concat_cols(row):
-        return "".join(row)
-
     def _aggregate_data(self):
         """Generate a unique id for each polling place"""
         id_template = {
@@ -124,10 +164,22 @@ class Interim(Election):
             "neighborhood": ["[GEO]_POLLING_PLACE_NEIGHBORHOOD", "[GEO]_ID_IBGE_CITY"],
             "city": ["[GEO]_ID_IBGE_CITY"],
         }
-        self.__data["ID"] = self.__data[id_template[self.aggregation_level]].apply(
-            self._concat_cols, axis=1
+        id_cols = id_template[self.aggregation_level]
+        columns = self.__data.columns
+        self.__data = (
+            self.__data.groupby(by=id_cols, observed=True, dropna=False)
+            .agg("first")
+            .reset_index()[columns]
+        )
+        self.__data.index = pd.Index(
+            [
+                json.dumps(key)
+                for key in self.__data[id_cols]
+                .astype(object)
+                .itertuples(index=False, name=None)
+            ],
+            name="ID",
         )
-        self.__data = self.__data.groupby(by="ID").agg("first")
 
     def _remove_foreign_places(self):
         """Remove places that are out of the region"""
@@ -163,12 +215,13 @@ class Interim(Election):
         """Remove unecessary cols"""
         unecessary_cols = {"city": [col for col in self.__data if "POLLING" in col]}
         self.__data.drop(
-            unecessary_cols.get(self.aggregation_level), axis=1, inplace=True
+            unecessary_cols.get(self.aggregation_level, []), axis=1, inplace=True
         )
 
     def _preprocessing_data(self):
         """Pre-processing of the polling places"""
         self._read_csv()
+        before = self._get_memory_usage(self.__data)
         self.logger_info("Pre-Processing data.")
         self._rename_cols()
         self._clean_addresses()
@@ -178,9 +231,11 @@ class Interim(Election):
         self._create_fetched_address_attribute()
         self._create_query_address_attribute()
         self._remove_unecessary_cols()
+        after = self._get_memory_usage(self.__data)
+        self.logger_memory_usage("Pre-Processing", before, after)
 
-    def _generate_address(self, row):
-        """Generate the address based on the aggregation level"""
+    def _generate_addresses(self, data: pd.DataFrame) -> List[str]:
+        """Generate the addresses based on the aggregation level"""
         address_template = {
             "polling_places": [
                 "[GEO]_POLLING_PLACE",
@@ -195,108 +250,280 @@ class Interim(Election):
             ],
             "city": ["[GEO]_CITY", "[GEO]_UF"],
         }
-        return row[address_template[self.aggregation_level]].str.cat(sep=", ")
+        columns = data[address_template[self.aggregation_level]].astype(object)
+        return [
+            ", ".join(value for value in values if isinstance(value, str))
+            for values in zip(*(columns[col] for col in columns))
+        ]
 
     # Geocoding functions
-    def _googlemaps_geocoding(self):
-        """Get coordinates for each polling place using google maps geocoding api"""
-        gmaps = googlemaps.Client(key=self.api_key, queries_per_second=40)
-        for count_rows, (index, row) in tqdm(
-            enumerate(self.__data.iterrows()), total=len(self.__data), desc="Geocoding"
-        ):
-            if not row["[GEO]_PRECISION"]:
-                try:
-                    components = {
-                        "country": self.region,
-                        "administrative_area": row["[GEO]_CITY"],
-                    }
-                    address = self._generate_address(row)
-                    self.__data.loc[index, "[GEO]_QUERY_ADDRESS"] = address
-                    result = gmaps.geocode(
-                        language="pt-BR", address=address, components=components
-                    )
-                    if not result:
-                        continue
-                    self.__data.loc[index, "[GEO]_LATITUDE"] = result[0]["geometry"][
-                        "location"
-                    ]["lat"]
-                    self.__data.loc[index, "[GEO]_LONGITUDE"] = result[0]["geometry"][
-                        "location"
-                    ]["lng"]
-                    self.__data.loc[index, "[GEO]_PRECISION"] = result[0]["geometry"][
-                        "location_type"
-                    ]
-                    self.__data.loc[index, "[GEO]_FETCHED_ADDRESS"] = result[0][
-                        "formatted_address"
-                    ]
-                except ConnectionError:
-                    pass
-            if not (count_rows + 1) % self.save_at:
-                self._save_data("locations_GMAPS.csv")
-
-    def _openstreet_geocoding(self):
-        """Get coordinates for each polling place using openstreet map geocoding api"""
-        geolocator = Nominatim(user_agent="brazilian_polling_places")
-        for count_rows, (index, row) in tqdm(
-            enumerate(self.__data.iterrows()), total=len(self.__data), desc="Geocoding"
-        ):
-            if not row["[GEO]_PRECISION"]:
-                try:
-                    address = self._generate_address(row)
-                    self.__data.loc[index, "[GEO]_QUERY_ADDRESS"] = address
-                    result = geolocator.geocode(address)
-                    if not result:
-                        continue
-                    self.__data.loc[index, "[GEO]_LATITUDE"] = result.latitude
-                    self.__data.loc[index, "[GEO]_LONGITUDE"] = result.longitude
-                    self.__data.loc[index, "[GEO]_PRECISION"] = "OSM"
-                    self.__data.loc[index, "[GEO]_FETCHED_ADDRESS"] = result.address
-
-                except ConnectionError:
-                    pass
-            if not (count_rows + 1) % self.save_at:
-                self._save_data("locations_OSM.csv")
-
-    def _ibge_geocoding(self):
-        filename = self.meshblock_filename.split(".")[0]
-        meshblock_filepath = join(
-            self._get_process_folder_path(state="raw"),
-            self.data_name,
-            filename,
-            f"{filename}.shp",
+    def _open_geocoding_cache(self):
+        """Open the geocoding cache shared by all elections"""
+        if self.geocoding_cache:
+            self.__cache = GeocodingCache(
+                filepath=join(
+                    self._get_initial_folders_path(), "geocoding_cache.sqlite"
+                ),
+                ttl=self.cache_ttl,
+                max_size=self.cache_max_size,
+            )
+
+    def _close_geocoding_cache(self):
+        """Close the geocoding cache reporting its hits and misses"""
+        if self.__cache is not None:
+            self.logger_info(
+                f"Geocoding cache: {self.__cache.hits} hits, "
+                f"{self.__cache.misses} misses."
+            )
+            self.__cache.close()
+            self.__cache = None
+
+    def _save_checkpoint(self):
+        """Save the geocoding progress"""
+        self.__journal.sync()
+        if self.__cache is not None:
+            self.__cache.commit()
+
+    def _replay_journal(self) -> pd.Index:
+        """Apply the journaled geocoding results and returns the ids of their rows"""
+        records = pd.DataFrame.from_dict(self.__journal.replay(), orient="index")
+        records = records[records.index.isin(self.__data.index)]
+        for col in records:
+            self.__data.loc[records.index, col] = records[col]
+        if not records.empty:
+            self.logger_info(f"Resuming geocoding from {len(records)} journaled rows.")
+        return records.index
+
+    def _generate_queries(self, geocoder: Geocoder, resolved: pd.Index) -> pd.DataFrame:
+        """Returns the query of each unresolved row and its unique query id"""
+        data = self.__data[~self.__data.index.isin(resolved)]
+        if geocoder.pending_only:
+            data = data[data["[GEO]_PRECISION"].isna()]
+        queries = pd.DataFrame(
+            {
+                "address": data["[GEO]_CLEAN_ADDRESS"].astype(object)
+                if geocoder.clean_address
+                else self._generate_addresses(data),
+                "city": data["[GEO]_CITY"].astype(object),
+                "uf": data["[GEO]_UF"].astype(object),
+                "city_id": data["[GEO]_ID_IBGE_CITY"].astype("float64"),
+            },
+            index=data.index,
+        )[geocoder.query_cols]
+        queries["query_id"] = queries.groupby(
+            geocoder.query_cols, sort=False, dropna=False
+        ).ngroup()
+        n_unique = queries["query_id"].nunique()
+        self.logger_info(
+            f"Geocoding {n_unique} unique queries for {len(queries)} rows "
+            f"(dedup ratio: {len(queries) / max(n_unique, 1):.2f})."
+        )
+        return queries
+
+    def _geocode_batch(
+        self, geocoder: Geocoder, batch: pd.DataFrame
+    ) -> List[Optional[Dict]]:
+        """Geocode a batch of unique queries checking the cache before the api"""
+        if self.__cache is None:
+            return geocoder.geocode_many(batch)
+        keys = [
+            (query["address"], geocoder.get_components(query))
+            for query in batch.to_dict("records")
+        ]
+        results = [self.__cache.get(self.geocoding_api, *key) for key in keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+        fetched = geocoder.geocode_many(batch.iloc[missing])
+        for i, result in zip(missing, fetched):
+            results[i] = result
+            if result is not None:
+                self.__cache.set(self.geocoding_api, *keys[i], result)
+        return results
+
+    def _apply_results(
+        self, queries: pd.DataFrame, results: Dict[int, Optional[Dict]]
+    ) -> None:
+        """Write the results of the geocoded queries with one assignment per column"""
+        if not results:
+            return
+        rows = queries[queries["query_id"].isin(list(results))]
+        self.__data.loc[rows.index, "[GEO]_QUERY_ADDRESS"] = rows["address"].to_numpy()
+        found = {query_id: result for query_id, result in results.items() if result}
+        found_rows = rows[rows["query_id"].isin(list(found))]
+        if len(found_rows):
+            for col in RESULT_COLS:
+                self.__data.loc[found_rows.index, col] = pd.Series(
+                    [found[query_id][col] for query_id in found_rows["query_id"]],
+                    index=found_rows.index,
+                )
+        self.__journal.append(
+            {"ID": index, "[GEO]_QUERY_ADDRESS": address, **results[query_id]}
+            for index, address, query_id in zip(
+                rows.index, rows["address"], rows["query_id"]
+            )
+            if results[query_id] is not None
+        )
+
+    def _run_geocoder(self, geocoder: Geocoder):
+        """Geocode each unique query of the unresolved rows in batches"""
+        filename = f"locations_{self.geocoding_api}"
+        self.__journal = GeocodingJournal(
+            filepath=join(self.cur_dir, f"{filename}.jsonl")
         )
+        queries = self._generate_queries(geocoder, resolved=self._replay_journal())
+        unique_queries = queries.drop_duplicates("query_id")
+        self.__journal.open()
+        try:
+            with tqdm(total=len(unique_queries), desc="Geocoding") as progress:
+                for start in range(0, len(unique_queries), self.save_at):
+                    batch = unique_queries.iloc[start : start + self.save_at]
+                    results = self._geocode_batch(
+                        geocoder, batch.drop(columns="query_id")
+                    )
+                    self._apply_results(queries, dict(zip(batch["query_id"], results)))
+                    self._save_checkpoint()
+                    progress.update(len(batch))
+        finally:
+            self.__journal.close()
+        self._save_data(f"{filename}.csv")
+        self.__journal.remove()
+
+    def _compute_cities_centroids(self, meshblock_filepath: str) -> pd.DataFrame:
+        """Read the cities meshblock and returns the centroid of each city"""
         meshblock = gpd.read_file(meshblock_filepath).infer_objects()
         meshblock["geometry"] = meshblock["geometry"].to_crs(crs=self.meshblock_crs)
-        meshblock["Y"] = meshblock.to_crs("+proj=cea").centroid.to_crs(meshblock.crs).y
-        meshblock["X"] = meshblock.to_crs("+proj=cea").centroid.to_crs(meshblock.crs).x
-        self.__data["[GEO]_ID_IBGE_CITY"] = self.__data["[GEO]_ID_IBGE_CITY"].astype(
-            "float64"
+        centroids = meshblock.to_crs("+proj=cea").centroid.to_crs(meshblock.crs)
+        return pd.DataFrame(
+            {
+                self.meshblock_col_id: meshblock[self.meshblock_col_id].astype("int64"),
+                "X": centroids.x,
+                "Y": centroids.y,
+            }
         )
 
-        self.__data = self.__data.merge(
-            meshblock[[self.meshblock_col_id, "X", "Y"]],
-            left_on="[GEO]_ID_IBGE_CITY",
-            right_on=self.meshblock_col_id,
-            how="left",
+    @staticmethod
+    def _read_cached_table(filepath: str, signature: bytes) -> Optional[pd.DataFrame]:
+        """Returns a table cached as parquet, or None when missing or outdated"""
+        if not isfile(filepath):
+            return None
+        if (pq.read_schema(filepath).metadata or {}).get(b"signature") != signature:
+            return None
+        return pq.read_table(filepath).to_pandas()
+
+    @staticmethod
+    def _write_cached_table(data: pd.DataFrame, filepath: str, signature: bytes):
+        """Cache a table as parquet recording the signature of its source"""
+        table = pa.Table.from_pandas(data, preserve_index=False)
+        pq.write_table(
+            table.replace_schema_metadata(
+                {**table.schema.metadata, b"signature": signature}
+            ),
+            filepath,
+        )
+
+    def _load_cities_centroids(self) -> pd.DataFrame:
+        """Returns the cities centroids indexed by id, computed once per meshblock"""
+        filename = self.meshblock_filename.split(".")[0]
+        folder = join(
+            self._get_process_folder_path(state="raw"), self.data_name, filename
+        )
+        meshblock_filepath = join(folder, f"{filename}.shp")
+        centroids_filepath = join(
+            folder, f"{filename}_centroids_{self.meshblock_crs}.parquet"
+        )
+        signature = self._get_file_signature(
+            meshblock_filepath, col_id=self.meshblock_col_id
+        )
+        centroids = self._read_cached_table(centroids_filepath, signature)
+        if centroids is None:
+            self.logger_info("Computing cities centroids.")
+            centroids = self._compute_cities_centroids(meshblock_filepath)
+            self._write_cached_table(centroids, centroids_filepath, signature)
+        return centroids.set_index(self.meshblock_col_id)
+
+    def _load_gazetteer(self) -> Gazetteer:
+        """Read the addresses gazetteer and index its streets"""
+        return Gazetteer(
+            filepath=join(
+                self._get_process_folder_path(state="raw"),
+                self.data_name,
+                self.gazetteer_filename,
+            ),
+            min_similarity=self.gazetteer_similarity or 0.8,
+        )
+
+    @staticmethod
+    def _normalize_cep(ceps: pd.Series) -> pd.Series:
+        """Keep only the 8 digits of the CEP codes"""
+        return ceps.astype("string").str.replace(r"\D", "", regex=True).str.zfill(8)
+
+    def _load_cep_centroids(self) -> pd.DataFrame:
+        """Read the CEP centroids file indexed by CEP code"""
+        ceps = pd.read_csv(
+            join(
+                self._get_process_folder_path(state="raw"),
+                self.data_name,
+                self.cep_filename,
+            ),
+            usecols=["CEP", "LATITUDE", "LONGITUDE"],
+            dtype={"CEP": "str", "LATITUDE": "float", "LONGITUDE": "float"},
         )
-        self.__data["[GEO]_QUERY_ADDRESS"] = self.__data["[GEO]_CLEAN_ADDRESS"]
-        self.__data["[GEO]_LONGITUDE"] = self.__data["X"]
-        self.__data["[GEO]_LATITUDE"] = self.__data["Y"]
-        self.__data["[GEO]_FETCHED_ADDRESS"] = self.__data["[GEO]_CLEAN_ADDRESS"]
-        self.__data["[GEO]_PRECISION"] = self.geocoding_api
-        self.__data.drop([self.meshblock_col_id, "X", "Y"], axis=1, inplace=True)
+        ceps["CEP"] = self._normalize_cep(ceps["CEP"])
+        return ceps.dropna().drop_duplicates("CEP").set_index("CEP")
 
-        self._save_data("locations_IBGE.csv")
+    def _cep_geocoding(self):
+        """Get coordinates for the polling places found in the CEP centroids"""
+        centroids = self._load_shared_asset(
+            key=("ceps", self.cep_filename), loader=self._load_cep_centroids
+        )
+        pending = self.__data[self.__data["[GEO]_PRECISION"].isna()]
+        ceps = self._normalize_cep(pending["[GEO]_CEP_CODE"])
+        found = centroids.reindex(ceps.to_numpy()).set_axis(pending.index).dropna()
+        self.__data.loc[found.index, "[GEO]_LATITUDE"] = found["LATITUDE"]
+        self.__data.loc[found.index, "[GEO]_LONGITUDE"] = found["LONGITUDE"]
+        self.__data.loc[found.index, "[GEO]_PRECISION"] = "CEP"
+        self.__data.loc[found.index, "[GEO]_QUERY_ADDRESS"] = self._generate_addresses(
+            self.__data.loc[found.index]
+        )
+        self.logger_info(f"Geocoded {len(found)} of {len(pending)} rows by CEP.")
+
+    def _init_geocoder(self) -> Geocoder:
+        """Returns the geocoder of the geocoding api filled with its parameters"""
+        geocoder = GEOCODERS[self.geocoding_api]
+        assets = {
+            "centroids": lambda: self._load_shared_asset(
+                key=self._get_year_asset_key(
+                    "centroids",
+                    self.meshblock_filename,
+                    self.meshblock_crs,
+                    self.meshblock_col_id,
+                ),
+                loader=self._load_cities_centroids,
+            ),
+            "gazetteer": lambda: self._load_shared_asset(
+                key=("gazetteer", self.gazetteer_filename, self.gazetteer_similarity),
+                loader=self._load_gazetteer,
+            ),
+        }
+        params = {}
+        for param in fields(geocoder):
+            if param.name in assets:
+                params[param.name] = assets[param.name]()
+            elif getattr(self, param.name, None) is not None:
+                params[param.name] = getattr(self, param.name)
+        return geocoder(**params)
 
     def _geocode_data(self):
-        """Run geocode function depending on the api chosen."""
+        """Run the geocoder of the geocoding api chosen."""
         self.logger_info(f"Geocoding with {self.geocoding_api}")
-        api_func = {
-            "GMAPS": self._googlemaps_geocoding,
-            "OSM": self._openstreet_geocoding,
-            "IBGE": self._ibge_geocoding,
-        }
-        return api_func.get(self.geocoding_api)()
+        if self.cep_filename:
+            self._cep_geocoding()
+        geocoder = self._init_geocoder()
+        if geocoder.remote:
+            self._open_geocoding_cache()
+        try:
+            self._run_geocoder(geocoder)
+        finally:
+            self._close_geocoding_cache()
 
     def run(self):
         """Generates interim __data regarding the polling places"""
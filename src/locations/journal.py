@@ -0,0 +1,61 @@
+"""Append-only journal of geocoded rows."""
+import json
+import os
+from dataclasses import dataclass
+from typing import Dict, IO, Iterable
+
+
+@dataclass
+class GeocodingJournal:
+    """Represents an append-only journal of geocoding progress.
+
+    Each geocoded row is appended as a json line and the file is synced to
+    disk in batches, so an interrupted run can resume from the last sync.
+
+    Attributes
+    ----------
+        filepath: str
+            Path of the journal file
+    """
+
+    filepath: str = None
+    __file: IO = None
+
+    def replay(self) -> Dict[str, Dict]:
+        """Returns the last journaled record of each row id"""
+        records = {}
+        if not os.path.exists(self.filepath):
+            return records
+        with open(self.filepath, encoding="utf-8") as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                records[record.pop("ID")] = record
+        return records
+
+    def open(self) -> None:
+        """Open the journal to append records"""
+        self.__file = open(self.filepath, "a", encoding="utf-8")
+
+    def append(self, records: Iterable[Dict]) -> None:
+        """Append the records to the journal"""
+        self.__file.writelines(f"{json.dumps(record)}\n" for record in records)
+
+    def sync(self) -> None:
+        """Write the appended records to disk"""
+        self.__file.flush()
+        os.fsync(self.__file.fileno())
+
+    def close(self) -> None:
+        """Sync and close the journal"""
+        if self.__file is not None and not self.__file.closed:
+            self.sync()
+            self.__file.close()
+
+    def remove(self) -> None:
+        """Close and delete the journal file"""
+        self.close()
+        if os.path.exists(self.filepath):
+            os.remove(self.filepath)
@@ -2,12 +2,12 @@
 from os.path import join
 from dataclasses import dataclass, field
 from typing import List
+import numpy as np
 import pandas as pd
 import geopandas as gpd
-import Levenshtein
 from tqdm import tqdm
-from shapely.geometry import Point
 from src.election import Election
+from src.locations.similarity import compute_similarities
 
 CAPITALS = {
     "AC": "RIO BRANCO",
@@ -40,6 +40,19 @@ CAPITALS = {
 }
 
 
+def get_city_limits(distances: pd.Series, city_buffers: List[float]) -> np.ndarray:
+    """Returns the city limits label of each distance to the city
+
+    Locations without a distance, as those missing coordinates, are "unknown".
+    """
+    return np.select(
+        [distances.isna(), distances <= 0]
+        + [distances <= buffer for buffer in city_buffers],
+        ["unknown", "in"] + [f"boundary_{buffer}" for buffer in city_buffers],
+        default="out",
+    )
+
+
 @dataclass
 class Processed(Election):
     """Represents the Brazilian polling places in processed state of processing.
@@ -60,6 +73,10 @@ class Processed(Election):
             Meshblock id column
         city_buffers: List
             List of city buffers
+        similarity_metrics: List[str]
+            Similarity measures computed besides levenshtein [token_set, jaro_winkler]
+        n_jobs: int
+            Number of processes used to compute the similarity measures
     """
 
     geocoding_api: str = None
@@ -68,6 +85,8 @@ class Processed(Election):
     meshblock_crs: str = None
     meshblock_col_id: str = None
     city_buffers: List = field(default_factory=list)
+    similarity_metrics: List[str] = field(default_factory=list)
+    n_jobs: int = 1
     __data: pd.DataFrame = field(default_factory=pd.DataFrame)
     __meshblock: gpd.GeoDataFrame = field(default_factory=gpd.GeoDataFrame)
 
@@ -83,9 +102,8 @@ class Processed(Election):
 
         self.__data = pd.read_csv(filepath, low_memory=False)
 
-    def _read_cities_meshblock_data(self):
-        """Read the raw cities meshblock data adnd retudns a geopandas dataframe."""
-        self.logger_info("Reading cities meshblock data.")
+    def _load_cities_meshblock_file(self) -> gpd.GeoDataFrame:
+        """Read the raw cities meshblock file in the meshblock coordinate system."""
         filename = self.meshblock_filename.split(".")[0]
         filepath = join(
             self._get_process_folder_path(state="raw"),
@@ -93,9 +111,18 @@ class Processed(Election):
             filename,
             f"{filename}.shp",
         )
-        self.__meshblock = gpd.read_file(filepath)
-        self.__meshblock["geometry"] = self.__meshblock["geometry"].to_crs(
-            crs=self.meshblock_crs
+        meshblock = gpd.read_file(filepath)
+        meshblock["geometry"] = meshblock["geometry"].to_crs(crs=self.meshblock_crs)
+        return meshblock
+
+    def _read_cities_meshblock_data(self):
+        """Read the raw cities meshblock data adnd retudns a geopandas dataframe."""
+        self.logger_info("Reading cities meshblock data.")
+        self.__meshblock = self._load_shared_asset(
+            key=self._get_year_asset_key(
+                "meshblock", self.meshblock_filename, self.meshblock_crs
+            ),
+            loader=self._load_cities_meshblock_file,
         )
 
     def _save_data(self, filename):
@@ -107,60 +134,73 @@ class Processed(Election):
     def _convert_data_to_geopandas(self):
         """Convert pandas to geopandas dataframe."""
         self.logger_info("Converting data to geodataframe.")
-        geometry = [
-            Point((row["[GEO]_LONGITUDE"], row[["[GEO]_LATITUDE"]]))
-            for _, row in self.__data.iterrows()
-        ]
+        coordinates = self.__data[["[GEO]_LONGITUDE", "[GEO]_LATITUDE"]].apply(
+            pd.to_numeric, errors="coerce"
+        )
+        missing = coordinates.isna().any(axis=1).to_numpy()
+        if missing.any():
+            self.logger_info(f"{missing.sum()} locations without coordinates.")
+        geometry = gpd.points_from_xy(
+            coordinates["[GEO]_LONGITUDE"], coordinates["[GEO]_LATITUDE"]
+        )
+        geometry[missing] = None
         self.__data = gpd.GeoDataFrame(
             self.__data, geometry=geometry, crs=self.meshblock_crs
         )
 
+    def _get_cities_geometries(self) -> gpd.GeoSeries:
+        """Returns the geometry of each city indexed by its id"""
+        cities = self.__meshblock.set_index(self.meshblock_col_id)["geometry"]
+        return cities[~cities.index.duplicated()]
+
+    def _project_cities_geometries(self) -> gpd.GeoSeries:
+        """Returns the cities geometries in the equal area projection"""
+        return self._get_cities_geometries().to_crs("+proj=cea")
+
+    def _generate_distance_to_city_measure(self):
+        """Generate the distance of each location to its city (0 when inside it)"""
+        self.logger_info("Generating distance to city measure.")
+        cities = self._load_shared_asset(
+            key=self._get_year_asset_key(
+                "projected_cities",
+                self.meshblock_filename,
+                self.meshblock_crs,
+                self.meshblock_col_id,
+            ),
+            loader=self._project_cities_geometries,
+        )
+        points = self.__data["geometry"].to_crs("+proj=cea")
+        polygons = gpd.GeoSeries(
+            cities.reindex(self.__data["[GEO]_ID_IBGE_CITY"].to_numpy()).to_numpy(),
+            index=points.index,
+            crs=cities.crs,
+        )
+        self.__data["[GEO]_DISTANCE_TO_CITY"] = polygons.distance(points)
+
     def _generate_city_limits_measure(self):
         """Generate city limit measure."""
         self.logger_info("Generating city limits measure")
         # Convert df_polling places to a geopandas dataframe
         self._convert_data_to_geopandas()
-        # Checking if coordinates are inside city boundaries
-        in_out_list = []
-        for _, location in tqdm(
-            self.__data.iterrows(), total=len(self.__data), leave=True
-        ):
-            city = self.__meshblock[
-                self.__meshblock[self.meshblock_col_id]
-                == location["[GEO]_ID_IBGE_CITY"]
-            ]
-            # Check if point is inside psolygon
-            if city["geometry"].contains(location["geometry"]).bool():
-                in_out_list += ["in"]
-                inside = True
-            else:
-                inside = False
-                buffer_id = 0
-                while not inside and buffer_id < len(self.city_buffers):
-                    buffered_city = (
-                        city.to_crs("+proj=cea")
-                        .buffer(self.city_buffers[buffer_id])
-                        .to_crs(crs=self.meshblock_crs)
-                    )
-                    if buffered_city.contains(location["geometry"]).bool():
-                        inside = True
-                        in_out_list += [f"boundary_{self.city_buffers[buffer_id]}"]
-                    else:
-                        buffer_id += 1
-            if not inside:
-                in_out_list += ["out"]
-
-        self.__data["[GEO]_CITY_LIMITS"] = in_out_list
-
-    def _generate_levenshtein_measure(self):
-        """Generate levenshtein measure."""
-        self.logger_info("Generating levenshtein similarity measure.")
-        self.__data["[GEO]_LEVENSHTEIN_SIMILARITY"] = self.__data.apply(
-            lambda x: Levenshtein.ratio(
-                x["[GEO]_QUERY_ADDRESS"].lower(), x["[GEO]_FETCHED_ADDRESS"].lower()
-            ),
-            axis=1,
+        self._generate_distance_to_city_measure()
+        self.__data["[GEO]_CITY_LIMITS"] = get_city_limits(
+            self.__data["[GEO]_DISTANCE_TO_CITY"], self.city_buffers
+        )
+
+    def _generate_similarity_measures(self):
+        """Generate the similarity measures between query and fetched addresses."""
+        self.logger_info("Generating addresses similarity measures.")
+        metrics = ["levenshtein"] + [
+            metric for metric in self.similarity_metrics if metric != "levenshtein"
+        ]
+        similarities = compute_similarities(
+            self.__data["[GEO]_QUERY_ADDRESS"],
+            self.__data["[GEO]_FETCHED_ADDRESS"],
+            metrics=metrics,
+            n_jobs=self.n_jobs,
         )
+        for metric in metrics:
+            self.__data[f"[GEO]_{metric.upper()}_SIMILARITY"] = similarities[metric]
 
     def _generate_rural_areas_mark(self):
         """Generates rural areas marks"""
@@ -198,7 +238,12 @@ class Processed(Election):
         self._read_interim_data()
         self._read_cities_meshblock_data()
         self._generate_city_limits_measure()
-        self._generate_levenshtein_measure()
+        self._generate_similarity_measures()
         self._generate_rural_areas_mark()
         self._generate_capitals_mark()
-        self._save_data(f"locations_{self.geocoding_api}.csv")
+        filename = f"locations_{self.geocoding_api}.csv"
+        self._save_data(filename)
+        self._set_shared_asset(
+            self._get_election_asset_key(join(self.cur_dir, filename)),
+            pd.DataFrame(self.__data),
+        )
@@ -0,0 +1,86 @@
+"""Batch similarity measures between query and fetched addresses."""
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import List, Tuple
+import numpy as np
+import pandas as pd
+import Levenshtein
+from src.locations.gazetteer import normalize_address
+
+CHUNKSIZE = 10000
+
+
+def token_set_ratio(first: str, second: str) -> float:
+    """Returns the similarity of the two texts ignoring repeated and unordered tokens"""
+    first_tokens, second_tokens = set(first.split()), set(second.split())
+    common = " ".join(sorted(first_tokens & second_tokens))
+    first_rest = " ".join([common, *sorted(first_tokens - second_tokens)]).strip()
+    second_rest = " ".join([common, *sorted(second_tokens - first_tokens)]).strip()
+    return max(
+        Levenshtein.ratio(common, first_rest),
+        Levenshtein.ratio(common, second_rest),
+        Levenshtein.ratio(first_rest, second_rest),
+    )
+
+
+SIMILARITY_METRICS = {
+    "levenshtein": Levenshtein.ratio,
+    "token_set": token_set_ratio,
+    "jaro_winkler": Levenshtein.jaro_winkler,
+}
+
+
+def normalize_addresses(addresses: pd.Series) -> pd.Series:
+    """Normalize each unique address only once, missing addresses become empty"""
+    values = addresses.dropna().unique()
+    return addresses.map(dict(zip(values, map(normalize_address, values)))).fillna("")
+
+
+def _compute_chunk(
+    pairs: Tuple[List[str], List[str]], metrics: List[str]
+) -> np.ndarray:
+    """Returns the metrics similarities of a chunk of addresses pairs"""
+    firsts, seconds = pairs
+    return np.column_stack(
+        [
+            np.fromiter(
+                map(SIMILARITY_METRICS[metric], firsts, seconds),
+                dtype=float,
+                count=len(firsts),
+            )
+            for metric in metrics
+        ]
+    )
+
+
+def compute_similarities(
+    first: pd.Series, second: pd.Series, metrics: List[str], n_jobs: int = 1
+) -> pd.DataFrame:
+    """Returns the metrics similarities between the normalized addresses.
+
+    Each unique pair of addresses is compared once, in chunks distributed over
+    `n_jobs` processes. Pairs with a missing address have no similarity.
+    """
+    pairs = pd.DataFrame(
+        {"first": normalize_addresses(first), "second": normalize_addresses(second)}
+    )
+    codes = pairs.groupby(["first", "second"], sort=False).ngroup().to_numpy()
+    unique = pairs.drop_duplicates()
+    chunks = [
+        (
+            unique["first"].iloc[start : start + CHUNKSIZE].tolist(),
+            unique["second"].iloc[start : start + CHUNKSIZE].tolist(),
+        )
+        for start in range(0, len(unique), CHUNKSIZE)
+    ]
+    compute_chunk = partial(_compute_chunk, metrics=metrics)
+    if n_jobs > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            results = list(executor.map(compute_chunk, chunks))
+    else:
+        results = list(map(compute_chunk, chunks))
+    scores = np.concatenate(results) if results else np.empty((0, len(metrics)))
+    similarities = pd.DataFrame(scores[codes], index=pairs.index, columns=metrics)
+    missing = (pairs["first"] == "") | (pairs["second"] == "")
+    similarities[missing] = np.nan
+    return similarities
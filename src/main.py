@@ -2,8 +2,9 @@
 import os
 import json
 import logging
+from copy import deepcopy
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List, Tuple
 from dotenv import load_dotenv
 from coloredlogs import install as coloredlogs_install
 from rich.traceback import install as rich_install
@@ -42,6 +43,27 @@ def load_json(params_path):
         return json.load(file)
 
 
+def get_election_targets(params) -> List[Tuple[str, str]]:
+    """Returns the (year, round) elections to be processed."""
+    targets = params["global"].get("targets")
+    if not targets:
+        return [(params["global"]["year"], params["global"]["round"])]
+    return [(str(year), str(round_)) for year, round_ in targets]
+
+
+def release_shared_assets(
+    shared_assets: Dict, target: Tuple[str, str], next_targets: List[Tuple[str, str]]
+):
+    """Remove the shared assets of the election that the next elections do not reuse."""
+    year, round_ = target
+    next_years = {next_year for next_year, _ in next_targets}
+    for key in list(shared_assets):
+        if key[:3] == ("election", year, round_) or (
+            key[:2] == ("year", year) and year not in next_years
+        ):
+            del shared_assets[key]
+
+
 def main():
     """Main function"""
     initialize_coloredlog()
@@ -57,12 +79,28 @@ def main():
     params["locations"]["api_key"] = env_var["api_key"]
     # Load switchers
     switchers = load_json(os.path.join(project_dir, "parameters", "switchers.json"))
-    # Creates and run the location processing pipeline
-    pipeline_locations = Pipeline("locations", params, switchers["locations"])
-    pipeline_locations.run()
-    # Creates and run the results processing pipeline
-    pipeline_results = Pipeline("results", params, switchers["results"])
-    pipeline_results.run()
+    # Assets loaded once and shared between the elections
+    shared_assets = {}
+    targets = get_election_targets(params)
+    for index, (year, round_) in enumerate(targets):
+        logging.getLogger("Main").info(f"Processing election {year} round {round_}.")
+        target_params = deepcopy(params)
+        target_params["global"]["year"] = year
+        target_params["global"]["round"] = round_
+        # Creates and run the location processing pipeline
+        pipeline_locations = Pipeline(
+            "locations",
+            target_params,
+            switchers["locations"],
+            shared_assets=shared_assets,
+        )
+        pipeline_locations.run()
+        # Creates and run the results processing pipeline
+        pipeline_results = Pipeline(
+            "results", target_params, switchers["results"], shared_assets=shared_assets
+        )
+        pipeline_results.run()
+        release_shared_assets(shared_assets, (year, round_), targets[index + 1 :])
 
 
 if __name__ == "__main__":
@@ -39,11 +39,14 @@ class Pipeline:
         Dictionary of parameters
     switchers: Dict[str, int]
         Dictionary of switchers to generate the pipeline
+    shared_assets: Dict
+        Loaded assets shared between the pipelines of a batch run
     """
 
     data_name: str
     params: Dict[str, str] = field(default_factory=dict)
     switchers: Dict[str, str] = field(default_factory=dict)
+    shared_assets: Dict = field(default_factory=dict)
     __pipeline: List[str] = field(default_factory=list)
     __raw: Election = None
     __interim: Election = None
@@ -81,21 +84,21 @@ class Pipeline:
         """Initialize raw class"""
         data_class = self._get_init_function("raw")
         parameters = self._generate_parameters(data_class())
-        self.__raw = data_class(**parameters)
+        self.__raw = data_class(**parameters, shared_assets=self.shared_assets)
         return self.__raw
 
     def init_interim(self):
         """Initialize interim class"""
         data_class = self._get_init_function("interim")
         parameters = self._generate_parameters(data_class())
-        self.__interim = data_class(**parameters)
+        self.__interim = data_class(**parameters, shared_assets=self.shared_assets)
         return self.__interim
 
     def init_processed(self):
         """Initialize processed class"""
         data_class = self._get_init_function("processed")
         parameters = self._generate_parameters(data_class())
-        self.__processed = data_class(**parameters)
+        self.__processed = data_class(**parameters, shared_assets=self.shared_assets)
         return self.__processed
 
     def get_pipeline_order(self):
@@ -1,12 +1,18 @@
 """Generates interim results data"""
+import json
 from os.path import join
-from typing import Dict, List
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Union
 from dataclasses import dataclass, field
 from tqdm import tqdm
+import numpy as np
 import pandas as pd
-from pandas.api.types import is_numeric_dtype
-from pandas_profiling import ProfileReport
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from pandas.api.types import is_numeric_dtype, union_categoricals
 from src.election import Election
+from src.results.raw import COLUMNAR_FOLDER, is_converted
 
 
 MAP_CANDIDACY = {"president": 1, "governor": 3}
@@ -36,6 +42,70 @@ MAP_COL_RENAME = {
     "QT_ELEITORES_BIOMETRIA_NH": "[ELECTION]_ELECTORATE_BIOMETRIA",
 }
 
+CATEGORY_COLS = ["SG_ UF", "NM_MUNICIPIO"]
+
+COUNT_COLS = [
+    "QT_APTOS",
+    "QT_COMPARECIMENTO",
+    "QT_ABSTENCOES",
+    "QT_VOTOS",
+    "QT_ELEITORES_BIOMETRIA_NH",
+]
+
+
+def concat_categorical(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate the frames keeping their categorical columns categorical"""
+    dtypes = {
+        col: pd.CategoricalDtype(
+            union_categoricals([frame[col] for frame in frames]).categories
+        )
+        for col in frames[0].select_dtypes("category")
+    }
+    return pd.concat(frame.astype(dtypes) for frame in frames)
+
+
+def get_candidacy_positions(candidacy_pos: Union[str, List[str]]) -> List[str]:
+    """Returns the candidacy positions as a list"""
+    if isinstance(candidacy_pos, str):
+        return [candidacy_pos]
+    return list(candidacy_pos)
+
+
+def get_candidates(
+    candidates: Union[List[int], Dict[str, List[int]]], candidacy_pos: str
+) -> List[int]:
+    """Returns the candidates ids of a candidacy position"""
+    if isinstance(candidates, dict):
+        return candidates[candidacy_pos]
+    return candidates
+
+
+def get_shares_map(columns: Iterable[str]) -> Dict[str, str]:
+    """Returns the denominator column of each vote-share numerator column"""
+    votes_cols = [
+        col for col in columns if "CANDIDATE" in col and not col.endswith("_(%)")
+    ] + ["[ELECTION]_NULL", "[ELECTION]_BLANK"]
+    shares_map = {col: "[ELECTION]_TURNOUT" for col in votes_cols}
+    shares_map["[ELECTION]_TURNOUT"] = "[ELECTION]_ELECTORATE"
+    shares_map["[ELECTION]_ABSTENTIONS"] = "[ELECTION]_ELECTORATE"
+    return shares_map
+
+
+def add_shares(data: pd.DataFrame, shares_map: Dict[str, str]) -> pd.DataFrame:
+    """Returns the data with all share columns computed in a single matrix divide.
+
+    Shares with a zero denominator are set to NaN.
+    """
+    numerators = data[list(shares_map)].to_numpy(dtype="float64")
+    denominators = data[list(shares_map.values())].to_numpy(dtype="float64")
+    shares = np.full(numerators.shape, np.nan)
+    np.divide(100 * numerators, denominators, out=shares, where=denominators > 0)
+    shares_cols = [f"{col}_(%)" for col in shares_map]
+    cols = list(data.columns) + [col for col in shares_cols if col not in data]
+    shares = pd.DataFrame(shares, index=data.index, columns=shares_cols)
+    data = pd.concat([data.drop(columns=shares_cols, errors="ignore"), shares], axis=1)
+    return data[cols]
+
 
 @dataclass
 class Interim(Election):
@@ -45,24 +115,78 @@ class Interim(Election):
 
     Attributes
     ----------
-        candidacy_pos: str
-            The candidacy position [presidente, governador]
-        candidates: List[str]
-            List of candidates ids
+        candidacy_pos: Union[str, List[str]]
+            The candidacy positions [president, governor]
+        candidates: Union[List[int], Dict[str, List[int]]]
+            List of candidates ids, or a list for each candidacy position
         aggregation_level: str
             The data geogrephical level of aggrevation
         geocoding_api: str
             The geocoding api to be used (Google Maps: GMAPS, OpenStreep Map: OSM)
+        header: List[str]
+            The raw results files header
+        chunksize: Optional[int]
+            Number of rows read at a time from each raw results file
+        n_jobs: int
+            Number of processes used to pre-process the raw results files
+        columnar_cache: bool
+            Whether to read the raw results from the parquet store
+        incremental_aggregation: bool
+            Whether to aggregate each file before concatenating them
+        profiling: str
+            The report generated at the end [summary, full]
+        profiling_sample: Optional[int]
+            Number of rows sampled to generate the full profiling
     """
 
-    candidacy_pos: str = None
-    candidates: List[str] = field(default_factory=list)
+    candidacy_pos: Union[str, List[str]] = None
+    candidates: Union[List[int], Dict[str, List[int]]] = field(default_factory=list)
     aggregation_level: str = None
     geocoding_api: str = None
     header: List[str] = field(default_factory=list)
+    chunksize: Optional[int] = None
+    n_jobs: int = 1
+    columnar_cache: bool = False
+    incremental_aggregation: bool = False
+    profiling: str = "summary"
+    profiling_sample: Optional[int] = None
     __results_data: pd.DataFrame = field(default_factory=pd.DataFrame)
     __locations_data: pd.DataFrame = field(default_factory=pd.DataFrame)
-    __list_results_data: List[pd.DataFrame] = field(default_factory=list)
+    __list_results_data: Dict[str, List[pd.DataFrame]] = field(default_factory=dict)
+
+    def _get_candidacy_positions_ids(self) -> List[int]:
+        """Returns the ids of the candidacy positions"""
+        return [
+            MAP_CANDIDACY[candidacy_pos]
+            for candidacy_pos in get_candidacy_positions(self.candidacy_pos)
+        ]
+
+    def _get_read_csv_kwargs(self) -> Dict:
+        """Returns the keyword arguments shared by the results csv readers"""
+        kwargs = {
+            "sep": ";",
+            "encoding": "latin1",
+            "na_values": ["#NULO#", -1, -3],
+            "usecols": lambda col: col in MAP_COL_RENAME,
+            "dtype": {
+                **{col: "category" for col in CATEGORY_COLS},
+                **{col: "UInt32" for col in COUNT_COLS},
+            },
+            "low_memory": False,
+        }
+        if self.header:
+            kwargs["names"] = self.header
+        return kwargs
+
+    def _read_results_csv_chunks(self, filepath: str) -> pd.DataFrame:
+        """Read the results file in chunks keeping only the candidacy positions rows"""
+        chunks = pd.read_csv(
+            filepath, chunksize=self.chunksize, **self._get_read_csv_kwargs()
+        )
+        positions_ids = self._get_candidacy_positions_ids()
+        return concat_categorical(
+            [chunk[chunk["CD_CARGO_PERGUNTA"].isin(positions_ids)] for chunk in chunks]
+        )
 
     def _read_results_csv(self, data_filename) -> pd.DataFrame:
         """Read the polling places.csv file and returns a pandas dataframe"""
@@ -71,24 +195,94 @@ class Interim(Election):
             self.data_name,
             data_filename,
         )
-        if self.header:
-            self.__results_data = pd.read_csv(
-                filepath,
-                sep=";",
-                encoding="latin1",
-                na_values=["#NULO#", -1, -3],
-                low_memory=False,
-                names=self.header,
+        if self.chunksize:
+            self.__results_data = self._read_results_csv_chunks(
+                filepath
             ).infer_objects()
         else:
             self.__results_data = pd.read_csv(
-                filepath,
-                sep=";",
-                encoding="latin1",
-                na_values=["#NULO#", -1, -3],
-                low_memory=False,
+                filepath, **self._get_read_csv_kwargs()
             ).infer_objects()
 
+    def _read_results_parquet_batches(
+        self, filepath: str, columns: List[str]
+    ) -> pa.Table:
+        """Read the parquet file in batches keeping only the candidacy positions rows"""
+        parquet_file = pq.ParquetFile(filepath, read_dictionary=CATEGORY_COLS)
+        schema = parquet_file.schema_arrow
+        positions_ids = pa.array(self._get_candidacy_positions_ids()).cast(
+            schema.field("CD_CARGO_PERGUNTA").type
+        )
+        return pa.Table.from_batches(
+            [
+                batch.filter(
+                    pc.is_in(batch["CD_CARGO_PERGUNTA"], value_set=positions_ids)
+                )
+                for batch in parquet_file.iter_batches(
+                    batch_size=self.chunksize, columns=columns
+                )
+            ],
+            schema=pa.schema([schema.field(col) for col in columns]),
+        )
+
+    def _read_results_parquet(self, data_filename) -> pd.DataFrame:
+        """Read the candidacy positions rows of a parquet results file"""
+        filepath = join(
+            self._get_process_folder_path(state="raw"),
+            self.data_name,
+            COLUMNAR_FOLDER,
+            data_filename,
+        )
+        columns = [
+            col for col in pq.read_schema(filepath).names if col in MAP_COL_RENAME
+        ]
+        if self.chunksize:
+            table = self._read_results_parquet_batches(filepath, columns)
+        else:
+            table = pq.read_table(
+                filepath,
+                columns=columns,
+                filters=[
+                    ("CD_CARGO_PERGUNTA", "in", self._get_candidacy_positions_ids())
+                ],
+                read_dictionary=CATEGORY_COLS,
+            )
+        for col in COUNT_COLS:
+            if col in table.column_names:
+                table = table.set_column(
+                    table.schema.get_field_index(col),
+                    col,
+                    table[col].cast(pa.uint32()),
+                )
+        self.__results_data = table.to_pandas()
+
+    def _compact_results_data(self) -> pd.DataFrame:
+        """Complete the compact dtype schema applied by the readers"""
+        # Positions ids are read as integers to be filtered by them
+        self.__results_data["CD_CARGO_PERGUNTA"] = self.__results_data[
+            "CD_CARGO_PERGUNTA"
+        ].astype("category")
+        for col in COUNT_COLS:
+            if col in self.__results_data and isinstance(
+                self.__results_data[col].dtype, pd.UInt32Dtype
+            ):
+                self.__results_data[col] = self.__results_data[col].astype(
+                    "float64" if self.__results_data[col].hasnans else "uint32"
+                )
+
+    def _read_results_data(self, data_filename) -> pd.DataFrame:
+        """Read a raw results file from the parquet store or the csv files"""
+        if data_filename.endswith(".parquet"):
+            self._read_results_parquet(data_filename)
+        else:
+            self._read_results_csv(data_filename)
+        self._compact_results_data()
+        self.logger_memory_usage(
+            f"Reading {data_filename}",
+            self._get_uncompacted_memory_usage(self.__results_data),
+            self._get_memory_usage(self.__results_data),
+        )
+
     def _read_locations_csv(self) -> pd.DataFrame:
         """Reads location csv from processed state folder"""
         filepath = join(
@@ -97,7 +291,12 @@ class Interim(Election):
             self.aggregation_level,
             f"locations_{self.geocoding_api}.csv",
         )
-        self.__locations_data = pd.read_csv(filepath).infer_objects()
+        self.__locations_data = self._load_shared_asset(
+            key=self._get_election_asset_key(filepath),
+            loader=lambda: pd.read_csv(
+                filepath, dtype={"[GEO]_UF": "category", "[GEO]_CITY": "category"}
+            ).infer_objects(),
+        ).copy()
 
     def _rename_cols(self) -> pd.DataFrame:
         """Rename columns"""
@@ -109,12 +308,12 @@ class Interim(Election):
         ]
         self.__results_data = self.__results_data[cols_filter]
 
-    def _filter_by_candidacy_pos(self):
+    def _filter_by_candidacy_pos(self, candidacy_pos: str):
         """Filter election results by candidacy position"""
         self.__results_data = self.__results_data[
             self.__results_data["[ELECTION]_ID_CANDIDACY_POSITION"]
-            == MAP_CANDIDACY[self.candidacy_pos]
-        ]
+            == MAP_CANDIDACY[candidacy_pos]
+        ].copy()
 
     @staticmethod
     def _rename_votes_cols(votes) -> pd.DataFrame:
@@ -127,14 +326,30 @@ class Interim(Election):
         map_rename_cols[MAP_BLANK_NULL["NULL"]] = "[ELECTION]_NULL"
         return votes.rename(columns=map_rename_cols)
 
-    def _get_votes_by_candidates(self) -> pd.DataFrame:
-        """Get votes by candadidate"""
-        votes = (
-            self.__results_data.copy()
-            .set_index(UNIQUE_ID + ["[ELECTION]_ID_CANDIDATE"])
-            .unstack(fill_value=0)["[ELECTION]_VOTES"]
-        )[self.candidates + list(MAP_BLANK_NULL.values())]
-
+    def _get_votes_by_candidates(self, candidates: List[int]) -> pd.DataFrame:
+        """Get votes by candadidate scattering them into a sections x candidates array"""
+        votes_ids = candidates + list(MAP_BLANK_NULL.values())
+        sections_codes, sections = pd.MultiIndex.from_frame(
+            self.__results_data[UNIQUE_ID]
+        ).factorize(sort=True)
+        sections.names = UNIQUE_ID
+        candidates_codes = pd.Index(votes_ids).get_indexer(
+            self.__results_data["[ELECTION]_ID_CANDIDATE"]
+        )
+        selected = candidates_codes >= 0
+        flat_codes = (
+            sections_codes[selected] * len(votes_ids) + candidates_codes[selected]
+        )
+        votes = np.bincount(
+            flat_codes,
+            weights=self.__results_data["[ELECTION]_VOTES"].to_numpy()[selected],
+            minlength=len(sections) * len(votes_ids),
+        ).reshape(len(sections), len(votes_ids))
+        votes = pd.DataFrame(
+            votes.astype(self.__results_data["[ELECTION]_VOTES"].dtype),
+            index=sections,
+            columns=votes_ids,
+        )
         return self._rename_votes_cols(votes)
 
     def _drop_duplicated_rows(self) -> pd.DataFrame:
@@ -164,47 +379,11 @@ class Interim(Election):
             inplace=True,
         )
 
-    def _create_candidates_shares(self):
-        """Create candidate vote-shares columns"""
-        candidates_cols = self._get_candidate_cols()
-        for col in candidates_cols:
-            self.__results_data[f"{col}_(%)"] = (
-                100
-                * self.__results_data[col]
-                / self.__results_data["[ELECTION]_TURNOUT"]
-            )
-
-    def _create_blank_null_shares(self):
-        """Create blank and null votes-shares"""
-        self.__results_data["[ELECTION]_NULL_(%)"] = (
-            100
-            * self.__results_data["[ELECTION]_NULL"]
-            / self.__results_data["[ELECTION]_TURNOUT"]
-        )
-        self.__results_data["[ELECTION]_BLANK_(%)"] = (
-            100
-            * self.__results_data["[ELECTION]_BLANK"]
-            / self.__results_data["[ELECTION]_TURNOUT"]
-        )
-
-    def _create_turnout_abstention_shares(self):
-        """Creates turnout and abstention shares"""
-        self.__results_data["[ELECTION]_TURNOUT_(%)"] = (
-            100
-            * self.__results_data["[ELECTION]_TURNOUT"]
-            / self.__results_data["[ELECTION]_ELECTORATE"]
-        )
-        self.__results_data["[ELECTION]_ABSTENTIONS_(%)"] = (
-            100
-            * self.__results_data["[ELECTION]_ABSTENTIONS"]
-            / self.__results_data["[ELECTION]_ELECTORATE"]
-        )
-
     def _create_shares_attributes(self):
         """Creates all share attributes"""
-        self._create_candidates_shares()
-        self._create_blank_null_shares()
-        self._create_turnout_abstention_shares()
+        self.__results_data = add_shares(
+            self.__results_data, get_shares_map(self.__results_data.columns)
+        )
 
     def _get_candidate_cols(self):
         return [c for c in self.__results_data.columns if "CANDIDATE" in c]
@@ -232,30 +411,88 @@ class Interim(Election):
         """Convert all columns names from results data to str"""
         self.__results_data.columns = self.__results_data.columns.astype(str)
 
-    def _pre_processing_data(self):
-        """Pre Processing the elections results"""
-        self.logger_info("Pre-processing elections results.")
-        raw_dir = join(self._get_state_folders_path(state="raw"), self.data_name)
-        filenames = self._get_files_in_id(raw_dir)
-        for filename in tqdm(filenames, desc="Pre-Processing", leave=False):
-            # Load raw data
-            self._read_results_csv(filename)
-            self._rename_cols()
-            self._filter_by_candidacy_pos()
-            self._drop_na_candidates()
-            self._fill_na_electorate_biometry()
-            votes = self._get_votes_by_candidates()
+    def _process_results_file(self, filename: str) -> Dict[str, pd.DataFrame]:
+        """Pre-process a raw results file and returns its data by candidacy position"""
+        # Load raw data
+        self._read_results_data(filename)
+        self._rename_cols()
+        self._drop_na_candidates()
+        self._fill_na_electorate_biometry()
+        results_data = self.__results_data
+        positions_data = {}
+        for candidacy_pos in get_candidacy_positions(self.candidacy_pos):
+            self.__results_data = results_data
+            self._filter_by_candidacy_pos(candidacy_pos)
+            votes = self._get_votes_by_candidates(
+                get_candidates(self.candidates, candidacy_pos)
+            )
             self._drop_duplicated_rows()
             self._join_votes(votes)
             self._drop_na_cols()
-            # Save the data as csv
-            self.__list_results_data.append(self.__results_data.copy())
+            if self.incremental_aggregation:
+                self._aggregate_partial_data()
+            positions_data[candidacy_pos] = self.__results_data
+        return positions_data
+
+    def _collect_results_data(self, list_positions_data: Iterable[Dict]):
+        """Collect the files results data by candidacy position"""
+        for positions_data in list_positions_data:
+            for candidacy_pos, results_data in positions_data.items():
+                self.__list_results_data.setdefault(candidacy_pos, []).append(
+                    results_data
+                )
+
+    def _get_results_filenames(self) -> List[str]:
+        """Returns the raw results files, the parquet ones when up to date"""
+        raw_dir = join(self._get_state_folders_path(state="raw"), self.data_name)
+        filenames = self._get_files_in_id(raw_dir)
+        if not self.columnar_cache:
+            return filenames
+        results_filenames = []
+        for filename in filenames:
+            parquet_filename = f"{filename.split('.')[0]}.parquet"
+            signature = self._get_file_signature(
+                join(raw_dir, filename), header=self.header
+            )
+            if is_converted(
+                join(raw_dir, COLUMNAR_FOLDER, parquet_filename), signature
+            ):
+                results_filenames.append(parquet_filename)
+            else:
+                self.logger_warning(
+                    f"{filename} has no up to date parquet file, reading the txt file."
+                )
+                results_filenames.append(filename)
+        return results_filenames
 
-    def _concatenate_list_results_data(self) -> pd.DataFrame:
-        """Concatenate the election results data in onw"""
-        self.__results_data = pd.concat(self.__list_results_data)
+    def _pre_processing_data(self):
+        """Pre Processing the elections results"""
+        self.logger_info("Pre-processing elections results.")
+        filenames = self._get_results_filenames()
+        if self.n_jobs > 1:
+            with ProcessPoolExecutor(max_workers=self.n_jobs) as executor:
+                self._collect_results_data(
+                    tqdm(
+                        executor.map(self._process_results_file, filenames),
+                        total=len(filenames),
+                        desc="Pre-Processing",
+                        leave=False,
+                    )
+                )
+        else:
+            self._collect_results_data(
+                tqdm(
+                    map(self._process_results_file, filenames),
+                    total=len(filenames),
+                    desc="Pre-Processing",
+                    leave=False,
+                )
+            )
+
+    def _concatenate_list_results_data(self, candidacy_pos: str) -> pd.DataFrame:
+        """Concatenate the election results data of a candidacy position in one"""
+        self.__results_data = pd.concat(self.__list_results_data.pop(candidacy_pos))
         self._convert_cols_to_str()
-        self.__list_results_data = []
 
     def _create_aggregation_map(self) -> Dict[str, str]:
         """Creates an aggregation map for the results data"""
@@ -281,12 +518,23 @@ class Interim(Election):
         }
         return merging_keys[self.aggregation_level]
 
+    def _group_by_aggregation_level(self) -> pd.DataFrame:
+        """Groups the results data by the merging keys of the aggregation level"""
+        group_keys = self._get_merging_keys()
+        agg_map = self._create_aggregation_map()
+        return self.__results_data.groupby(by=group_keys, observed=True).agg(agg_map)
+
+    def _aggregate_partial_data(self) -> pd.DataFrame:
+        """Reduce the results data of a single file to the aggregation level"""
+        self.__results_data = self._group_by_aggregation_level().reset_index(drop=True)
+
     def _aggregate_data(self) -> pd.DataFrame:
         """Aggregate the results data considering the aggregation level paramenter"""
         self.logger_info(f"Aggregating data by {self.aggregation_level}.")
-        group_keys = self._get_merging_keys()
-        agg_map = self._create_aggregation_map()
-        self.__results_data = self.__results_data.groupby(by=group_keys).agg(agg_map)
+        before = self._get_memory_usage(self.__results_data)
+        self.__results_data = self._group_by_aggregation_level()
+        after = self._get_memory_usage(self.__results_data)
+        self.logger_memory_usage("Aggregating", before, after)
 
     def _get_not_common_cols(self) -> List[str]:
         """Get the columns in the location data that does not exist in the results data"""
@@ -300,9 +548,10 @@ class Interim(Election):
         """Merge results data with location data"""
         self.logger_info("Merging results and location data.")
         # Load data with geocode information from polling places
-        self._read_locations_csv()
         merging_keys = self._get_merging_keys()
-        self.__locations_data.set_index(merging_keys, inplace=True)
+        if self.__locations_data.empty:
+            self._read_locations_csv()
+            self.__locations_data.set_index(merging_keys, inplace=True)
         not_commom_cols = self._get_not_common_cols()
         self.__results_data = self.__results_data.join(
             self.__locations_data[not_commom_cols]
@@ -326,24 +575,67 @@ class Interim(Election):
 
     def _generate_pandas_profiling(self):
         """Generates pandas profiling"""
+        from pandas_profiling import ProfileReport
+
         self.logger_info("Generating profiling.")
-        self.__results_data.reset_index(drop=True, inplace=True)
-        profiling = ProfileReport(df=self.__results_data, minimal=True)
+        data = self.__results_data.reset_index(drop=True)
+        if self.profiling_sample and self.profiling_sample < len(data):
+            data = data.sample(n=self.profiling_sample, random_state=0)
+        profiling = ProfileReport(df=data, minimal=True)
         profiling.to_file(join(self.cur_dir, "profiling.html"))
 
+    def _get_votes_sanity_sums(self, data: pd.DataFrame) -> Dict[str, int]:
+        """Returns the vote totals used to sanity check the results data"""
+        votes_cols = [
+            col for col in self._get_candidate_cols() if not col.endswith("_(%)")
+        ] + ["[ELECTION]_BLANK", "[ELECTION]_NULL"]
+        votes = data[votes_cols].sum(axis=1)
+        return {
+            "electorate": int(data["[ELECTION]_ELECTORATE"].sum()),
+            "turnout": int(data["[ELECTION]_TURNOUT"].sum()),
+            "abstentions": int(data["[ELECTION]_ABSTENTIONS"].sum()),
+            "votes": int(votes.sum()),
+            "rows_electorate_mismatch": int(
+                (
+                    data["[ELECTION]_TURNOUT"] + data["[ELECTION]_ABSTENTIONS"]
+                    != data["[ELECTION]_ELECTORATE"]
+                ).sum()
+            ),
+            "rows_votes_above_turnout": int((votes > data["[ELECTION]_TURNOUT"]).sum()),
+        }
+
+    def _generate_summary_report(self):
+        """Generates a summary report of the results data in a single pass"""
+        self.logger_info("Generating summary report.")
+        data = self.__results_data.reset_index(drop=True)
+        summary = pd.DataFrame({"count": data.count(), "nulls": data.isna().sum()})
+        summary = summary.join(data.describe().drop(index="count").T)
+        report = {
+            "columns": json.loads(summary.to_json(orient="index")),
+            "sanity": self._get_votes_sanity_sums(data),
+        }
+        with open(join(self.cur_dir, "summary.json"), "w") as file:
+            json.dump(report, file, indent=4)
+        summary.to_html(join(self.cur_dir, "summary.html"))
+
     def run(self):
         """Run interim process"""
         self.init_logger_name(msg="Results (Interim)")
         self.init_state(state="interim")
         self.logger_info("Generating interim data.")
-        self._make_folders(
-            folders=[self.data_name, self.aggregation_level, self.candidacy_pos.lower()]
-        )
         self._pre_processing_data()
-        self._concatenate_list_results_data()
-        self._aggregate_data()
-        self._create_shares_attributes()
-        self._merge_results_and_location_data()
-        self._remove_unecessary_cols()
-        self._save_results_data()
-        self._generate_pandas_profiling()
+        for candidacy_pos in get_candidacy_positions(self.candidacy_pos):
+            self.logger_info(f"Generating {candidacy_pos} interim data.")
+            self._make_folders(
+                folders=[self.data_name, self.aggregation_level, candidacy_pos.lower()]
+            )
+            self._concatenate_list_results_data(candidacy_pos)
+            self._aggregate_data()
+            self._create_shares_attributes()
+            self._merge_results_and_location_data()
+            self._remove_unecessary_cols()
+            self._save_results_data()
+            if self.profiling == "full":
+                self._generate_pandas_profiling()
+            else:
+                self._generate_summary_report()
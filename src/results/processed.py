@@ -2,9 +2,16 @@
 import json
 from os.path import join
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Union
 import pandas as pd
 from src.election import Election
+from src.locations.processed import get_city_limits
+from src.results.interim import (
+    add_shares,
+    get_candidacy_positions,
+    get_candidates,
+    get_shares_map,
+)
 
 
 @dataclass
@@ -17,37 +24,44 @@ class Processed(Election):
     ----------
         aggregation_level: str
             The data geogrephical level of aggrevation
-        candidacy_pos: str
-            The candidacy position [presidente, governador]
+        candidacy_pos: Union[str, List[str]]
+            The candidacy positions [president, governor]
         geocoding_api: str
             The geocoding api to be used (Google Maps: GMAPS, OpenStreep Map: OSM)
         levenshtesin_threshold: float
             The threshold considereing the levenshtein similarity measure of addresses
+        similarity_thresholds: Dict[str, float]
+            The thresholds of the other similarity measures [token_set, jaro_winkler]
         precision_filter: List[str]
             The list of precision to be filter from the dataset
         city_limits_fitler: List[str]
             The list of city limits to be filter from the dataset
+        city_buffers: List[float]
+            The city buffers used to label the city limits again from the distances
+            to the cities, keeping the locations labels when empty
     """
 
     aggregation_level: str = None
-    candidacy_pos: str = None
+    candidacy_pos: Union[str, List[str]] = None
     geocoding_api: str = None
-    candidates: str = None
+    candidates: Union[List[int], Dict[str, List[int]]] = None
     levenshtein_threshold: float = None
+    similarity_thresholds: Dict[str, float] = field(default_factory=dict)
     precision_filter: List[str] = field(default_factory=list)
     city_limits_filter: List[str] = field(default_factory=list)
+    city_buffers: List[float] = field(default_factory=list)
     __data: pd.DataFrame = field(default_factory=pd.DataFrame)
     __data_info: Dict = field(default_factory=dict)
     __per: Optional[int] = None
 
-    def _read_data_csv(self) -> pd.DataFrame:
+    def _read_data_csv(self, candidacy_pos: str) -> pd.DataFrame:
         """Read the data.csv file and returns a pandas dataframe"""
         self.logger_info("Reading interim data.")
         filepath = join(
             self._get_process_folder_path(state="interim"),
             self.data_name,
             self.aggregation_level,
-            self.candidacy_pos,
+            candidacy_pos.lower(),
             f"data_{self.geocoding_api}.csv",
         )
         self.__data = pd.read_csv(filepath).infer_objects()
@@ -70,13 +84,24 @@ class Processed(Election):
         self.__data_info["null_votes"] = self.__data["[ELECTION]_NULL"]
         self.__data_info["null_blank"] = self.__data["[ELECTION]_BLANK"]
 
+    def _generate_city_limits(self):
+        """Label the city limits again using the results city buffers"""
+        if self.city_buffers and "[GEO]_DISTANCE_TO_CITY" in self.__data:
+            self.__data["[GEO]_CITY_LIMITS"] = get_city_limits(
+                self.__data["[GEO]_DISTANCE_TO_CITY"], self.city_buffers
+            )
+
     def _filter_data(self):
         """Filter the dataset according to parameters"""
         self.logger_info("Filtering dataset by parameters.")
-        self.__data = self.__data[
-            self.__data["[GEO]_LEVENSHTEIN_SIMILARITY"]
-            >= float(self.levenshtein_threshold)
-        ]
+        thresholds = {"levenshtein": self.levenshtein_threshold}
+        thresholds.update(self.similarity_thresholds)
+        for metric, threshold in thresholds.items():
+            similarity = self.__data[f"[GEO]_{metric.upper()}_SIMILARITY"]
+            # Locations without a fetched address, as the CEP ones, have no similarity
+            self.__data = self.__data[
+                (similarity >= float(threshold)) | similarity.isna()
+            ]
         self.__data = self.__data[
             self.__data["[GEO]_CITY_LIMITS"].isin(self.city_limits_filter)
         ]
@@ -84,6 +109,10 @@ class Processed(Election):
             self.__data["[GEO]_PRECISION"].isin(self.precision_filter)
         ]
 
+    def _create_shares_attributes(self):
+        """Recomputes all share attributes of the filtered dataset"""
+        self.__data = add_shares(self.__data, get_shares_map(self.__data.columns))
+
     def _calculate_per(self) -> int:
         """Calculates the dataset's percentual of electorate representation"""
         original_turnout = self.__data_info["turnout"]
@@ -101,14 +130,15 @@ class Processed(Election):
             join(self.cur_dir, f"data_{self.geocoding_api}.csv"), index=False
         )
 
-    def _generate_report(self):
+    def _generate_report(self, candidacy_pos: str):
         """Generates json report concerning the parameters used to create the dataset"""
         self.logger_info("Generating final report.")
         report_dict = {
             "Levenshtein Threshold": str(self.levenshtein_threshold),
+            "Similarity Thresholds": self.similarity_thresholds,
             "City Limits": self.city_limits_filter,
             "Precisions": self.precision_filter,
-            "Candidates": self.candidates,
+            "Candidates": get_candidates(self.candidates, candidacy_pos),
             "#Rows": f"{len(self.__data)} ({100 * len(self.__data) / self.__data_info['size']}%)",
         }
 
@@ -120,14 +150,17 @@ class Processed(Election):
         self.init_logger_name(msg="Results (Processed)")
         self.init_state(state="processed")
         self.logger_info("Generating processed data.")
-        self._make_folders(
-            folders=[self.data_name, self.aggregation_level, self.candidacy_pos.lower()]
-        )
-        self._read_data_csv()
-        self._remove_external_places()
-        self._get_data_info()
-        self._filter_data()
-        self._calculate_per()
-        self._make_per_fold()
-        self._save_data()
-        self._generate_report()
+        for candidacy_pos in get_candidacy_positions(self.candidacy_pos):
+            self._make_folders(
+                folders=[self.data_name, self.aggregation_level, candidacy_pos.lower()]
+            )
+            self._read_data_csv(candidacy_pos)
+            self._remove_external_places()
+            self._get_data_info()
+            self._generate_city_limits()
+            self._filter_data()
+            self._create_shares_attributes()
+            self._calculate_per()
+            self._make_per_fold()
+            self._save_data()
+            self._generate_report(candidacy_pos)
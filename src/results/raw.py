@@ -1,5 +1,6 @@
 """Generate raw data for election results"""
-from os.path import join
+from os import remove, replace
+from os.path import isfile, join
 from typing import List, Optional
 import re
 import zipfile
@@ -7,8 +8,24 @@ from dataclasses import dataclass, field
 from urllib.request import urlopen, urlretrieve
 from bs4 import BeautifulSoup
 from tqdm import tqdm
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 from src.election import Election
 
+COLUMNAR_FOLDER = "parquet"
+
+COLUMNAR_CHUNKSIZE = 1000000
+
+
+def is_converted(parquet_filepath: str, signature: bytes) -> bool:
+    """Whether the parquet file was converted from the current raw file"""
+    if not isfile(parquet_filepath):
+        return False
+    return (pq.read_schema(parquet_filepath).metadata or {}).get(
+        b"signature"
+    ) == signature
+
 
 @dataclass
 class Raw(Election):
@@ -22,11 +39,17 @@ class Raw(Election):
         ext: file extension
         html: the html page where the raw data can be downloaded
         links: list of links to download raw data
+        header: the raw results files header
+        columnar_cache: whether to convert the raw files to a parquet store
+        chunksize: number of rows converted at a time to the parquet store
 
     """
 
     url_data: str = None
     ext: str = None
+    header: List[str] = field(default_factory=list)
+    columnar_cache: bool = False
+    chunksize: Optional[int] = None
     __html: str = None
     __links: List[str] = field(default_factory=list)
 
@@ -36,7 +59,7 @@ class Raw(Election):
 
     def _download_html(self) -> None:
         """Donwload the election results page"""
-        # self.url_data = self._fill_url()
+        self.url_data = self._fill_url()
         self.__html = urlopen(self.url_data).read().decode("utf-8")
 
     def _get_links(self) -> None:
@@ -80,6 +103,60 @@ class Raw(Election):
                 old_filename=old_filename, new_filename=new_filename
             )
 
+    @staticmethod
+    def _get_chunk_table(chunk: pd.DataFrame) -> pa.Table:
+        """Returns the arrow table of a raw chunk with nullable types
+
+        Columns without values are stored as text, their type is unknown.
+        """
+        chunk = chunk.convert_dtypes(convert_boolean=False)
+        null_cols = chunk.columns[chunk.isna().all()]
+        chunk[null_cols] = chunk[null_cols].astype("string")
+        return pa.Table.from_pandas(chunk, preserve_index=False)
+
+    def _convert_raw_file_to_parquet(
+        self, filepath: str, parquet_filepath: str, signature: bytes
+    ) -> None:
+        """Stream a raw file in chunks into a parquet file recording its signature"""
+        chunks = pd.read_csv(
+            filepath,
+            sep=";",
+            encoding="latin1",
+            na_values=["#NULO#", -1, -3],
+            names=self.header or None,
+            chunksize=self.chunksize or COLUMNAR_CHUNKSIZE,
+        )
+        tmp_filepath = f"{parquet_filepath}.tmp"
+        writer = None
+        try:
+            for chunk in chunks:
+                table = self._get_chunk_table(chunk)
+                if writer is None:
+                    schema = table.schema.with_metadata({b"signature": signature})
+                    writer = pq.ParquetWriter(tmp_filepath, schema, compression="zstd")
+                writer.write_table(table.cast(writer.schema))
+        except BaseException:
+            if writer is not None:
+                writer.close()
+                remove(tmp_filepath)
+            raise
+        if writer is not None:
+            writer.close()
+            replace(tmp_filepath, parquet_filepath)
+
+    def _convert_raw_data_to_parquet(self) -> None:
+        """Convert the raw files into a columnar store partitioned by state"""
+        self.logger_info("Converting raw data to parquet.")
+        raw_dir = self.cur_dir
+        list_filename = self._get_files_in_cur_dir()
+        self._mkdir(COLUMNAR_FOLDER)
+        for filename in tqdm(list_filename, desc="Converting", leave=False):
+            filepath = join(raw_dir, filename)
+            parquet_filepath = join(self.cur_dir, f"{filename.split('.')[0]}.parquet")
+            signature = self._get_file_signature(filepath, header=self.header)
+            if not is_converted(parquet_filepath, signature):
+                self._convert_raw_file_to_parquet(filepath, parquet_filepath, signature)
+
     def _empty_folder_run(self):
         """Run without files in the working directory"""
         self._download_html()
@@ -102,3 +179,5 @@ class Raw(Election):
             self.logger_warning(
                 "Non empty directory, the process only runs on empty folders!"
             )
+        if self.columnar_cache:
+            self._convert_raw_data_to_parquet()